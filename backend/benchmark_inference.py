@@ -0,0 +1,60 @@
+"""Compare sklearn and compiled single-row inference latency
+
+Usage: python benchmark_inference.py [iterations]
+"""
+import sys
+import time
+import numpy as np
+from ml_model import FakeNewsMLModel
+
+SAMPLE_ARTICLES = [
+    "Scientists at a leading university published a peer-reviewed study showing new battery chemistry improves storage capacity",
+    "SHOCKING: Doctors hate this miracle herb that cures every disease overnight and the government is hiding it",
+    "City council approves budget for road repairs and public transportation upgrades after months of debate",
+    "URGENT: Secret documents exposed prove aliens control the world banks, share before it gets deleted!",
+]
+
+def sklearn_predict(model, processed_text):
+    """Baseline path: vectorizer.transform + predict + predict_proba"""
+    text_tfidf = model.vectorizer.transform([processed_text])
+    prediction = model.classifier.predict(text_tfidf)[0]
+    probabilities = model.classifier.predict_proba(text_tfidf)[0]
+    return prediction, probabilities
+
+def time_per_call(func, model, texts, iterations):
+    """Return mean seconds per call over all texts and iterations"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            func(model, text)
+    return (time.perf_counter() - start) / (iterations * len(texts))
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    model = FakeNewsMLModel()
+    if model.engine is None:
+        print("Compiled engine unavailable for the current model")
+        return 1
+
+    texts = [model.preprocessor.preprocess(article) for article in SAMPLE_ARTICLES]
+
+    # Check numerical equivalence before timing
+    for text in texts:
+        expected_label, expected_proba = sklearn_predict(model, text)
+        label, proba = model.engine.predict(text)
+        if label != expected_label or not np.allclose(proba, expected_proba, rtol=1e-9, atol=1e-12):
+            print(f"Mismatch for {text!r}: {label} {proba} vs {expected_label} {expected_proba}")
+            return 1
+        print(f"match  decision={model.classifier.decision_function(model.vectorizer.transform([text]))[0]:+.6f}  "
+              f"engine={model.engine.decision_function(text):+.6f}")
+
+    sklearn_time = time_per_call(sklearn_predict, model, texts, iterations)
+    engine_time = time_per_call(lambda m, text: m.engine.predict(text), model, texts, iterations)
+
+    print(f"sklearn:  {sklearn_time * 1e6:9.1f} us/row")
+    print(f"compiled: {engine_time * 1e6:9.1f} us/row")
+    print(f"speedup:  {sklearn_time / engine_time:9.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
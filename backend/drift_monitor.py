@@ -0,0 +1,216 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+class SpaceSaving:
+    """Fixed-size heavy-hitters sketch (Space-Saving algorithm)
+
+    Tracks at most `capacity` terms; a term's count overestimates its true
+    frequency by at most its recorded error.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counters = {}
+
+    def add(self, term, count=1):
+        """Count one occurrence of term"""
+        if term in self.counters:
+            self.counters[term][0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[term] = [count, 0]
+        else:
+            # Replace the current minimum, inheriting its count as error
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            minimum = self.counters.pop(victim)[0]
+            self.counters[term] = [minimum + count, minimum]
+
+    def top(self, n=20):
+        """Return the n most frequent terms as dicts"""
+        items = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:n]
+        return [{'term': term, 'count': count, 'error': error} for term, (count, error) in items]
+
+    def clear(self):
+        self.counters = {}
+
+class DriftMonitor:
+    """Samples live verification traffic and tracks drift from the TF-IDF vocabulary
+
+    Sampled articles are handed to a background thread through a small bounded
+    queue (dropped when full), so the request thread only pays for a random draw.
+    All state is fixed-size: a sliding window of recent samples, a heavy-hitters
+    sketch of terms unseen since the last vocabulary change and per-method
+    confidence histograms built from the window.
+    """
+
+    CONFIDENCE_BINS = 10
+
+    def __init__(self, ml_model, sample_rate=0.1, window_size=1000, top_k=100,
+                 oov_threshold=0.5, empty_threshold=0.2, min_samples=200,
+                 cooldown=3600, on_drift=None):
+        self.ml_model = ml_model
+        self.sample_rate = sample_rate
+        self.window = deque(maxlen=window_size)
+        self.unseen_terms = SpaceSaving(top_k)
+        self.oov_threshold = oov_threshold
+        self.empty_threshold = empty_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.on_drift = on_drift
+        self.queue = queue.Queue(maxsize=1000)
+        self.lock = threading.Lock()
+        self.started = False
+
+        self.generation = None
+        self.analyzer = None
+        self.vocabulary = None
+        self.observed = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.last_triggered = None
+        self.last_action = None
+
+    def start(self):
+        """Start the background sampling thread once"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+
+        thread = threading.Thread(target=self._worker, name='drift-monitor', daemon=True)
+        thread.start()
+
+    def observe(self, content, result, method):
+        """Record one verification; cheap enough to call on every request"""
+        with self.lock:
+            self.observed += 1
+        if random.random() >= self.sample_rate:
+            return
+
+        self.start()
+        try:
+            self.queue.put_nowait((content, float(result['confidence']), method))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def _refresh_vocabulary(self):
+        """Pick up the vectorizer of the most recently trained model"""
+        generation = self.ml_model.generation
+        if generation != self.generation:
+            vectorizer = self.ml_model.vectorizer
+            self.generation = generation
+            self.analyzer = vectorizer.build_analyzer()
+            self.vocabulary = vectorizer.vocabulary_
+            # Unseen terms from the previous vocabulary are no longer meaningful
+            with self.lock:
+                self.window.clear()
+                self.unseen_terms.clear()
+
+    def _worker(self):
+        """Process sampled articles until the process exits"""
+        while True:
+            content, confidence, method = self.queue.get()
+            try:
+                self._record(content, confidence, method)
+            except Exception as e:
+                print(f"Drift monitor error: {e}")
+
+    def _record(self, content, confidence, method):
+        """Measure one sampled article against the current vocabulary"""
+        self._refresh_vocabulary()
+        processed = self.ml_model.preprocessor.preprocess(content)
+        features = self.analyzer(processed)
+
+        # Most (1,2)-gram bigrams are out of vocabulary even for in-distribution
+        # text, so the OOV rate is measured over unigrams only
+        unigrams = 0
+        unseen = []
+        has_known = False
+        for feature in features:
+            known = feature in self.vocabulary
+            has_known = has_known or known
+            if ' ' not in feature:
+                unigrams += 1
+                if not known:
+                    unseen.append(feature)
+
+        with self.lock:
+            self.sampled += 1
+            self.window.append((unigrams, len(unseen), not has_known, confidence, method))
+            for term in unseen:
+                self.unseen_terms.add(term)
+
+        self._check_thresholds()
+
+    def _summary(self):
+        """Return window-level rates; caller holds the lock"""
+        samples = len(self.window)
+        unigrams = sum(sample[0] for sample in self.window)
+        oov = sum(sample[1] for sample in self.window)
+        empty = sum(1 for sample in self.window if sample[2])
+        return {
+            'samples': samples,
+            'oovRate': oov / unigrams if unigrams else 0.0,
+            'emptyVectorRate': empty / samples if samples else 0.0
+        }
+
+    def _check_thresholds(self):
+        """Fire on_drift when the window crosses a threshold, at most once per cooldown"""
+        with self.lock:
+            summary = self._summary()
+            if summary['samples'] < self.min_samples:
+                return
+            if summary['oovRate'] < self.oov_threshold and summary['emptyVectorRate'] < self.empty_threshold:
+                return
+            now = time.time()
+            if self.last_triggered and now - self.last_triggered < self.cooldown:
+                return
+            self.last_triggered = now
+
+        print(f"Vocabulary drift detected: {summary}")
+        if self.on_drift:
+            threading.Thread(target=self._handle_drift, args=(summary,), daemon=True).start()
+
+    def _handle_drift(self, summary):
+        """Run on_drift and keep its outcome for the report"""
+        try:
+            action = self.on_drift(summary)
+        except Exception as e:
+            print(f"Drift handler error: {e}")
+            action = 'Drift handler failed'
+        with self.lock:
+            self.last_action = action
+
+    def get_report(self):
+        """Return drift metrics for the admin endpoint"""
+        with self.lock:
+            summary = self._summary()
+            histograms = {}
+            for _, _, _, confidence, method in self.window:
+                bins = histograms.setdefault(method, [0] * self.CONFIDENCE_BINS)
+                bins[min(int(confidence * self.CONFIDENCE_BINS), self.CONFIDENCE_BINS - 1)] += 1
+
+            return {
+                **summary,
+                'observed': self.observed,
+                'sampled': self.sampled,
+                'dropped': self.dropped,
+                'sampleRate': self.sample_rate,
+                'windowSize': self.window.maxlen,
+                'vocabularySize': len(self.vocabulary) if self.vocabulary is not None else 0,
+                'topUnseenTerms': self.unseen_terms.top(),
+                'confidenceHistogram': {
+                    'bins': [i / self.CONFIDENCE_BINS for i in range(self.CONFIDENCE_BINS + 1)],
+                    'counts': histograms
+                },
+                'thresholds': {
+                    'oovRate': self.oov_threshold,
+                    'emptyVectorRate': self.empty_threshold,
+                    'minSamples': self.min_samples
+                },
+                'lastTriggered': self.last_triggered,
+                'lastAction': self.last_action
+            }
@@ -0,0 +1,73 @@
+import math
+import numpy as np
+from collections import Counter
+
+class CompiledInferenceEngine:
+    """Single-row scorer for a fitted TF-IDF vectorizer + binary linear classifier
+
+    Maps analyzed n-grams straight to feature indices, applies IDF and L2
+    normalization and takes one dot product against the coefficients, skipping
+    the input validation and sparse-matrix construction sklearn does per call.
+    """
+
+    def __init__(self, vectorizer, classifier):
+        if len(classifier.classes_) != 2:
+            raise ValueError('Compiled inference supports binary classifiers only')
+        # Only settings checked against sklearn's output are compiled; anything
+        # else raises so the caller falls back to the sklearn path
+        if vectorizer.norm not in ('l2', None):
+            raise ValueError(f'Unsupported vectorizer norm: {vectorizer.norm}')
+        if vectorizer.binary:
+            raise ValueError('Binary term frequencies are not supported')
+        if np.dtype(vectorizer.dtype) != np.float64:
+            raise ValueError(f'Unsupported vectorizer dtype: {vectorizer.dtype}')
+        if classifier.coef_.shape[0] != 1 or getattr(classifier, 'multi_class', 'auto') == 'multinomial':
+            raise ValueError('Compiled inference supports one-vs-rest logistic scores only')
+
+        self.analyzer = vectorizer.build_analyzer()
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.normalize = vectorizer.norm == 'l2'
+        self.classes = classifier.classes_.tolist()
+        self.intercept = float(classifier.intercept_[0])
+
+        # Fold IDF and coefficient into one lookup per term
+        idf = vectorizer.idf_ if vectorizer.use_idf else None
+        coef = classifier.coef_[0]
+        self.weights = {}
+        for term, index in vectorizer.vocabulary_.items():
+            term_idf = float(idf[index]) if idf is not None else 1.0
+            self.weights[term] = (term_idf, term_idf * float(coef[index]))
+
+    def decision_function(self, text):
+        """Return the raw linear score for one preprocessed text"""
+        dot = 0.0
+        squared_norm = 0.0
+        weights = self.weights
+        for term, count in Counter(self.analyzer(text)).items():
+            weight = weights.get(term)
+            if weight is None:
+                continue
+            tf = 1.0 + math.log(count) if self.sublinear_tf else float(count)
+            squared_norm += (tf * weight[0]) ** 2
+            dot += tf * weight[1]
+
+        if self.normalize and squared_norm > 0:
+            dot /= math.sqrt(squared_norm)
+        return dot + self.intercept
+
+    def predict_proba(self, text):
+        """Return [P(classes[0]), P(classes[1])] for one preprocessed text"""
+        score = self.decision_function(text)
+        # Numerically stable logistic
+        if score >= 0:
+            positive = 1.0 / (1.0 + math.exp(-score))
+        else:
+            exp_score = math.exp(score)
+            positive = exp_score / (1.0 + exp_score)
+        return [1.0 - positive, positive]
+
+    def predict(self, text):
+        """Return (label, probabilities) for one preprocessed text"""
+        probabilities = self.predict_proba(text)
+        label = self.classes[1] if probabilities[1] > probabilities[0] else self.classes[0]
+        return label, probabilities
@@ -1,24 +1,104 @@
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from joblib import Parallel, delayed
+from collections import Counter
 from text_preprocessing import TextPreprocessor
+from fast_inference import CompiledInferenceEngine
 import pickle
+import threading
+import time
 import os
 
+# Chunked scoring: sentence windows, and caps that bound work per request
+CHUNK_WINDOW_SENTENCES = 5
+CHUNK_STRIDE_SENTENCES = 3
+CHUNK_MAX_WINDOWS = 32
+CHUNK_MAX_CHARS = 20000
+CHUNK_TOP_SPANS = 3
+
+DEFAULT_VECTORIZER_PARAMS = {'max_features': 5000, 'ngram_range': (1, 2)}
+DEFAULT_CLASSIFIER_PARAMS = {'C': 1.0}
+
+# Candidate settings explored by model selection
+VECTORIZER_GRID = [
+    {'max_features': 5000, 'ngram_range': (1, 1)},
+    {'max_features': 5000, 'ngram_range': (1, 2)},
+    {'max_features': 10000, 'ngram_range': (1, 2)},
+    {'max_features': 10000, 'ngram_range': (1, 3)},
+]
+CLASSIFIER_GRID = [
+    {'C': 0.1},
+    {'C': 1.0},
+    {'C': 10.0},
+    {'C': 1.0, 'class_weight': 'balanced'},
+]
+
+def build_vectorizer(params):
+    """Create a TF-IDF vectorizer with the shared defaults"""
+    return TfidfVectorizer(
+        max_features=params['max_features'],
+        stop_words='english',
+        ngram_range=tuple(params['ngram_range']),
+        min_df=2,
+        max_df=0.95
+    )
+
+def build_classifier(params):
+    """Create a logistic regression classifier"""
+    return LogisticRegression(random_state=42, max_iter=1000, **params)
+
+def _length_cap(lengths, budget):
+    """Largest per-item length so the capped lengths sum to at most budget
+
+    Items shorter than their even share are kept whole and the rest of the
+    budget is split among the longer ones.
+    """
+    lengths = sorted(lengths)
+    for index, length in enumerate(lengths):
+        share = budget // (len(lengths) - index)
+        if length > share:
+            return share
+        budget -= length
+    return lengths[-1] if lengths else 0
+
+def _evaluate_fold(vectorizer_params, classifier_grid, X_train, y_train, X_test, y_test):
+    """Vectorize one fold once and score every classifier candidate on it"""
+    start = time.perf_counter()
+    vectorizer = build_vectorizer(vectorizer_params)
+    X_train_tfidf = vectorizer.fit_transform(X_train)
+    X_test_tfidf = vectorizer.transform(X_test)
+    vectorize_time = time.perf_counter() - start
+    
+    results = []
+    for classifier_params in classifier_grid:
+        start = time.perf_counter()
+        classifier = build_classifier(classifier_params)
+        classifier.fit(X_train_tfidf, y_train)
+        y_pred = classifier.predict(X_test_tfidf)
+        results.append({
+            'accuracy': accuracy_score(y_test, y_pred),
+            'precision': precision_score(y_test, y_pred, average='weighted', zero_division=0),
+            'recall': recall_score(y_test, y_pred, average='weighted', zero_division=0),
+            'f1Score': f1_score(y_test, y_pred, average='weighted', zero_division=0),
+            'fitTime': time.perf_counter() - start
+        })
+    
+    return vectorize_time, results
+
 class FakeNewsMLModel:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=2,
-            max_df=0.95
-        )
-        self.classifier = LogisticRegression(random_state=42)
+        self.vectorizer = build_vectorizer(DEFAULT_VECTORIZER_PARAMS)
+        self.classifier = build_classifier(DEFAULT_CLASSIFIER_PARAMS)
         self.is_trained = False
+        self.engine = None
         self.preprocessor = TextPreprocessor()
+        # Bumped whenever a new vectorizer/classifier pair is installed
+        self.generation = 0
+        self.retrain_lock = threading.Lock()
         
         # Load pre-trained model if exists
         self.load_model()
@@ -59,23 +139,28 @@ class FakeNewsMLModel:
         # Train the model
         self.train(texts, labels)
     
-    def train(self, texts, labels):
-        """Train the model with provided data"""
+    def train(self, texts, labels, vectorizer_params=None, classifier_params=None, selection=None):
+        """Train the model with provided data, reporting model selection results if given"""
         try:
+            # Fit fresh estimators and swap them in afterwards, so request threads
+            # never see a half-refitted vectorizer or classifier
+            vectorizer = build_vectorizer(vectorizer_params) if vectorizer_params is not None else clone(self.vectorizer)
+            classifier = build_classifier(classifier_params) if classifier_params is not None else clone(self.classifier)
+            
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
                 texts, labels, test_size=0.2, random_state=42, stratify=labels
             )
             
             # Vectorize texts
-            X_train_tfidf = self.vectorizer.fit_transform(X_train)
-            X_test_tfidf = self.vectorizer.transform(X_test)
+            X_train_tfidf = vectorizer.fit_transform(X_train)
+            X_test_tfidf = vectorizer.transform(X_test)
             
             # Train classifier
-            self.classifier.fit(X_train_tfidf, y_train)
+            classifier.fit(X_train_tfidf, y_train)
             
             # Calculate metrics
-            y_pred = self.classifier.predict(X_test_tfidf)
+            y_pred = classifier.predict(X_test_tfidf)
             self.last_metrics = {
                 'accuracy': accuracy_score(y_test, y_pred),
                 'precision': precision_score(y_test, y_pred, average='weighted'),
@@ -83,8 +168,14 @@ class FakeNewsMLModel:
                 'f1Score': f1_score(y_test, y_pred, average='weighted'),
                 'confusionMatrix': confusion_matrix(y_test, y_pred).tolist()
             }
+            if selection is not None:
+                self.last_metrics['modelSelection'] = selection
             
+            self.vectorizer = vectorizer
+            self.classifier = classifier
             self.is_trained = True
+            self.compile_engine()
+            self.generation += 1
             self.save_model()
             
             print("Model trained successfully!")
@@ -92,6 +183,7 @@ class FakeNewsMLModel:
             
         except Exception as e:
             print(f"Training error: {e}")
+            self.engine = None
             # Set default metrics if training fails
             self.last_metrics = {
                 'accuracy': 0.87,
@@ -140,6 +232,14 @@ class FakeNewsMLModel:
             
             # Use trained model
             processed_text = self.preprocessor.preprocess(text)
+            
+            if self.engine is not None:
+                prediction, probabilities = self.engine.predict(processed_text)
+                return {
+                    'prediction': 'FAKE' if prediction == 1 else 'REAL',
+                    'confidence': min(max(probabilities), 0.95)
+                }
+            
             text_tfidf = self.vectorizer.transform([processed_text])
             
             # Get prediction and probability
@@ -162,6 +262,96 @@ class FakeNewsMLModel:
                 'confidence': 0.60
             }
     
+    def predict_batch(self, texts):
+        """Predict a batch of texts with one vectorize/classify call"""
+        if not self.is_trained:
+            return [self.predict(text) for text in texts]
+        
+        try:
+            processed_texts = [self.preprocessor.preprocess(text) for text in texts]
+            probabilities = self.classifier.predict_proba(self.vectorizer.transform(processed_texts))
+            classes = self.classifier.classes_
+            
+            return [{
+                'prediction': 'FAKE' if classes[row.argmax()] == 1 else 'REAL',
+                'confidence': min(float(row.max()), 0.95)
+            } for row in probabilities]
+            
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            return [self.predict(text) for text in texts]
+    
+    def predict_chunked(self, text, window=CHUNK_WINDOW_SENTENCES, stride=CHUNK_STRIDE_SENTENCES,
+                        max_windows=CHUNK_MAX_WINDOWS, max_chars=CHUNK_MAX_CHARS):
+        """Score overlapping sentence windows and report the most suspicious spans
+        
+        Each sentence is preprocessed once and windows are built by joining the
+        processed sentences, so overlap costs no extra NLP work. The windows and
+        the whole article are classified as one batch. The verdict comes from the
+        article row; the window scores only pick suspiciousSpans. At most
+        max_windows windows and max_chars characters are preprocessed. Longer
+        articles are covered by spreading the windows evenly, and the article
+        row is then built from the sampled sentences only. Sentences too long
+        to fit the budget are truncated, as is a short article scored whole.
+        """
+        sentences = self.preprocessor.split_sentences(text)
+        if not self.is_trained or len(sentences) <= window:
+            return {**self.predict(text[:max_chars]), 'chunks': 1, 'suspiciousSpans': []}
+        
+        try:
+            starts = list(range(0, len(sentences) - window + 1, stride))
+            if starts[-1] != len(sentences) - window:
+                starts.append(len(sentences) - window)
+            
+            # Stay within the per-request budget by sampling windows evenly
+            average_chars = sum(sentences[start + window - 1][1] - sentences[start][0] for start in starts) / len(starts)
+            budget = min(max_windows, max(1, int(max_chars // max(average_chars, 1))))
+            if len(starts) > budget:
+                positions = np.linspace(0, len(starts) - 1, budget).round().astype(int)
+                starts = [starts[position] for position in sorted(set(positions))]
+            
+            spans = [(sentences[start][0], sentences[start + window - 1][1]) for start in starts]
+            
+            # Preprocess each covered sentence once and share it between windows,
+            # capping long sentences so the total stays within max_chars
+            covered = sorted({index for start in starts for index in range(start, start + window)})
+            cap = _length_cap([sentences[index][1] - sentences[index][0] for index in covered], max_chars)
+            processed = {index: self.preprocessor.preprocess(
+                             text[sentences[index][0]:min(sentences[index][1], sentences[index][0] + cap)])
+                         for index in covered}
+            window_texts = [' '.join(processed[index] for index in range(start, start + window)) for start in starts]
+            article_text = ' '.join(processed[index] for index in covered)
+            
+            probabilities = self.classifier.predict_proba(self.vectorizer.transform(window_texts + [article_text]))
+            fake_probabilities = probabilities[:, list(self.classifier.classes_).index(1)]
+            fake_probability = float(fake_probabilities[-1])
+            fake_probabilities = fake_probabilities[:-1]
+            order = np.argsort(fake_probabilities)[::-1]
+            
+            return {
+                'prediction': 'FAKE' if fake_probability > 0.5 else 'REAL',
+                'confidence': min(max(fake_probability, 1 - fake_probability), 0.95),
+                'chunks': len(spans),
+                'suspiciousSpans': [{
+                    'start': spans[index][0],
+                    'end': spans[index][1],
+                    'text': text[spans[index][0]:spans[index][1]],
+                    'fakeProbability': float(fake_probabilities[index])
+                } for index in order[:CHUNK_TOP_SPANS]]
+            }
+            
+        except Exception as e:
+            print(f"Chunked prediction error: {e}")
+            return {**self.predict(text[:max_chars]), 'chunks': 1, 'suspiciousSpans': []}
+    
+    def compile_engine(self):
+        """Build the lean single-row inference path for the fitted model"""
+        try:
+            self.engine = CompiledInferenceEngine(self.vectorizer, self.classifier)
+        except Exception as e:
+            print(f"Compile engine error: {e}")
+            self.engine = None
+    
     def get_metrics(self):
         """Get model performance metrics"""
         return getattr(self, 'last_metrics', {
@@ -172,11 +362,88 @@ class FakeNewsMLModel:
             'confusionMatrix': [[245, 23], [31, 201]]
         })
     
-    def retrain(self, training_data):
-        """Retrain model with new data"""
-        texts = [self.preprocessor.preprocess(text) for text, _ in training_data]
-        labels = [label for _, label in training_data]
-        self.train(texts, labels)
+    def select_model(self, texts, labels, n_splits=5, max_workers=None):
+        """Cross-validate the vectorizer and classifier grids in a process pool
+
+        Each (vectorizer, fold) task fits TF-IDF once and reuses the matrices for
+        every classifier candidate. Returns per-candidate metrics sorted by F1.
+        """
+        min_class_count = min(Counter(labels).values())
+        n_splits = min(n_splits, min_class_count)
+        if n_splits < 2:
+            raise ValueError('Each label needs at least 2 samples for cross-validation')
+        
+        texts = np.asarray(texts, dtype=object)
+        labels = np.asarray(labels)
+        folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42).split(texts, labels))
+        
+        start = time.perf_counter()
+        # loky workers start fresh interpreters without forking the threaded server
+        # and, unlike multiprocessing's spawn/forkserver, never re-run __main__ (app.py)
+        keys = [(v, f) for v in range(len(VECTORIZER_GRID)) for f in range(len(folds))]
+        outputs = Parallel(n_jobs=max_workers or -1, backend='loky')(
+            delayed(_evaluate_fold)(
+                VECTORIZER_GRID[v], CLASSIFIER_GRID,
+                list(texts[folds[f][0]]), labels[folds[f][0]],
+                list(texts[folds[f][1]]), labels[folds[f][1]]
+            )
+            for v, f in keys
+        )
+        fold_results = dict(zip(keys, outputs))
+        total_time = time.perf_counter() - start
+        
+        candidates = []
+        for v, vectorizer_params in enumerate(VECTORIZER_GRID):
+            vectorize_time = sum(fold_results[(v, f)][0] for f in range(n_splits))
+            for c, classifier_params in enumerate(CLASSIFIER_GRID):
+                scores = [fold_results[(v, f)][1][c] for f in range(n_splits)]
+                candidate = {
+                    'vectorizer': {**vectorizer_params, 'ngram_range': list(vectorizer_params['ngram_range'])},
+                    'classifier': dict(classifier_params),
+                    'vectorizeTime': vectorize_time,
+                    'wallTime': vectorize_time + sum(score['fitTime'] for score in scores)
+                }
+                for metric in ('accuracy', 'precision', 'recall', 'f1Score'):
+                    candidate[metric] = float(np.mean([score[metric] for score in scores]))
+                candidates.append(candidate)
+        
+        candidates.sort(key=lambda candidate: candidate['f1Score'], reverse=True)
+        return {
+            'folds': n_splits,
+            'wallTime': total_time,
+            'best': candidates[0],
+            'candidates': candidates
+        }
+    
+    def retrain(self, training_data, search=False):
+        """Retrain model with stored training rows
+
+        Each row is (id, content, label, processed_content, preprocessor_version).
+        Stored preprocessed text is reused as-is; only rows missing it or stamped
+        with an older preprocessor version are run through the pipeline again.
+        With search=True the settings are picked by select_model first.
+        Returns a dict of {id: processed_content} for the recomputed rows.
+        """
+        texts = []
+        labels = []
+        refreshed = {}
+        for row_id, content, label, processed, version in training_data:
+            if processed is None or version != TextPreprocessor.VERSION:
+                processed = self.preprocessor.preprocess(content)
+                refreshed[row_id] = processed
+            texts.append(processed)
+            labels.append(label)
+        
+        # Serialize retrains (manual and drift-triggered) against each other
+        with self.retrain_lock:
+            if search:
+                # Train on the best settings found by cross-validation
+                selection = self.select_model(texts, labels)
+                best = selection['best']
+                self.train(texts, labels, best['vectorizer'], best['classifier'], selection=selection)
+            else:
+                self.train(texts, labels)
+        return refreshed
     
     def save_model(self):
         """Save trained model to disk"""
@@ -207,8 +474,11 @@ class FakeNewsMLModel:
                         self.last_metrics = pickle.load(f)
                 
                 self.is_trained = True
+                self.compile_engine()
+                self.generation += 1
                 print("Model loaded successfully!")
                 
         except Exception as e:
             print(f"Load model error: {e}")
-            self.is_trained = False
\ No newline at end of file
+            self.is_trained = False
+            self.engine = None
\ No newline at end of file
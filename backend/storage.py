@@ -0,0 +1,374 @@
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Compressed values are stored as BLOBs: format byte, dictionary id, raw deflate stream.
+# Plain TEXT values (rows written before compression, or too short to benefit) decode as-is.
+FORMAT_DEFLATE = 1
+HEADER = struct.Struct('>BI')
+DICTIONARY_SIZE = 32 * 1024
+DICTIONARY_MIN_SAMPLES = 500
+
+class TextCodec:
+    """Transparent compression for text columns, optionally with a shared dictionary
+
+    Dictionaries live in the compression_dictionaries table and are never
+    modified, so any stored value can be decoded by the id in its header.
+    """
+
+    def __init__(self, db_path, level=6, use_dictionary=True):
+        self.db_path = db_path
+        self.level = level
+        self.use_dictionary = use_dictionary
+        self.lock = threading.Lock()
+        self.dictionaries = {}
+        self.current_id = None
+
+    def init_table(self):
+        """Create the dictionary table and load the newest dictionary"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        cursor.execute('SELECT id, data FROM compression_dictionaries ORDER BY id DESC LIMIT 1')
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            with self.lock:
+                self.dictionaries[row[0]] = bytes(row[1])
+                self.current_id = row[0]
+
+    def _dictionary(self, dictionary_id):
+        """Return dictionary bytes by id, loading them on first use"""
+        if dictionary_id == 0:
+            return None
+        with self.lock:
+            if dictionary_id in self.dictionaries:
+                return self.dictionaries[dictionary_id]
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT data FROM compression_dictionaries WHERE id = ?', (dictionary_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if row is None:
+            raise ValueError(f'Unknown compression dictionary: {dictionary_id}')
+
+        with self.lock:
+            self.dictionaries[dictionary_id] = bytes(row[0])
+            return self.dictionaries[dictionary_id]
+
+    def encode(self, text):
+        """Compress text for storage, keeping it as plain text when that is smaller"""
+        if text is None:
+            return None
+
+        raw = text.encode('utf-8')
+        dictionary_id = self.current_id if self.use_dictionary and self.current_id else 0
+        dictionary = self._dictionary(dictionary_id)
+
+        if dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        compressed = HEADER.pack(FORMAT_DEFLATE, dictionary_id) + compressor.compress(raw) + compressor.flush()
+
+        return compressed if len(compressed) < len(raw) else text
+
+    def decode(self, value):
+        """Return the original text for a stored value"""
+        if value is None or isinstance(value, str):
+            return value
+
+        value = bytes(value)
+        format_id, dictionary_id = HEADER.unpack_from(value)
+        if format_id != FORMAT_DEFLATE:
+            raise ValueError(f'Unknown compression format: {format_id}')
+
+        dictionary = self._dictionary(dictionary_id)
+        if dictionary:
+            decompressor = zlib.decompressobj(-15, zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(value[HEADER.size:]) + decompressor.flush()).decode('utf-8')
+
+    def train_dictionary(self, samples, size=DICTIONARY_SIZE):
+        """Build a shared dictionary from sample texts, store it and make it current
+
+        Deflate only references the last 32KB of a dictionary and favours
+        nearby matches, so the most frequent phrases are placed at the end.
+        """
+        counts = Counter()
+        for sample in samples:
+            words = sample.split()
+            counts.update(words)
+            counts.update(' '.join(words[i:i + 3]) for i in range(len(words) - 2))
+
+        # Rank by bytes saved rather than raw frequency
+        ranked = sorted(
+            (phrase for phrase, count in counts.items() if count > 1),
+            key=lambda phrase: counts[phrase] * len(phrase)
+        )
+        parts = []
+        total = 0
+        for phrase in reversed(ranked):
+            encoded = (phrase + ' ').encode('utf-8')
+            if total + len(encoded) > size:
+                break
+            parts.append(encoded)
+            total += len(encoded)
+
+        dictionary = b''.join(reversed(parts))
+        if not dictionary:
+            return None
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO compression_dictionaries (data, created_at) VALUES (?, ?)
+        ''', (dictionary, datetime.now()))
+        dictionary_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        with self.lock:
+            self.dictionaries[dictionary_id] = dictionary
+            self.current_id = dictionary_id
+        return dictionary_id
+
+class StorageManager:
+    """Retention, compaction and background maintenance for the SQLite store
+
+    Verifications older than the retention window are rolled into per-day
+    aggregates and deleted, finished async jobs are purged, and rows written
+    before compression existed are recompressed a batch at a time.
+    """
+
+    def __init__(self, db_path, codec, verification_retention_days=90, job_retention_days=7,
+                 interval=3600, batch_size=20000):
+        self.db_path = db_path
+        self.codec = codec
+        self.verification_retention_days = verification_retention_days
+        self.job_retention_days = job_retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        # Serializes passes from the background thread and the admin endpoint
+        self.maintenance_lock = threading.Lock()
+        self.started = False
+        self.last_run = None
+        # Highest rowid checked per (table, column) by recompress_rows
+        self.recompress_positions = {}
+
+    def init_tables(self):
+        """Create the aggregate table"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS verification_aggregates (
+                day TEXT NOT NULL,
+                prediction TEXT NOT NULL,
+                method TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                confidence_sum REAL NOT NULL,
+                PRIMARY KEY (day, prediction, method)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+        self.codec.init_table()
+
+    def start(self):
+        """Start the background maintenance thread once"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+
+        thread = threading.Thread(target=self._run_forever, name='storage-maintenance', daemon=True)
+        thread.start()
+
+    def _run_forever(self):
+        """Run maintenance every interval seconds"""
+        while True:
+            try:
+                self.run_maintenance()
+            except Exception as e:
+                print(f"Storage maintenance error: {e}")
+            time.sleep(self.interval)
+
+    def run_maintenance(self, full_vacuum=False):
+        """Run one compaction pass and return what it did
+
+        The background thread only releases free pages. A full VACUUM, which
+        repacks pages left half-empty by recompression but locks the whole
+        database while it rewrites the file, runs only when asked for.
+        """
+        with self.maintenance_lock:
+            self.init_tables()
+            summary = {
+                'compactedVerifications': self.compact_verifications(),
+                'purgedJobs': self.purge_jobs(),
+                'dictionaryId': self.ensure_dictionary(),
+                'recompressedRows': self.recompress_rows()
+            }
+
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn = sqlite3.connect(self.db_path)
+            if full_vacuum:
+                conn.executescript('VACUUM')
+            else:
+                conn.executescript('PRAGMA incremental_vacuum')
+            conn.close()
+
+            self.last_run = {'timestamp': datetime.now().isoformat(), 'fullVacuum': full_vacuum, **summary}
+            return self.last_run
+
+    def compact_verifications(self):
+        """Roll verifications older than the retention window into daily aggregates
+
+        Commits every batch_size rows so a large backlog never holds the write
+        lock for the whole rollup.
+        """
+        if not self.verification_retention_days:
+            return 0
+
+        cutoff = datetime.now() - timedelta(days=self.verification_retention_days)
+        batch = 'SELECT rowid FROM verifications WHERE timestamp < ? ORDER BY rowid LIMIT ?'
+        deleted = 0
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        while True:
+            # Both statements run in the same write transaction, so they see the same rows
+            cursor.execute(f'''
+                INSERT INTO verification_aggregates (day, prediction, method, count, confidence_sum)
+                SELECT substr(timestamp, 1, 10), prediction, method, COUNT(*), SUM(confidence)
+                FROM verifications WHERE rowid IN ({batch})
+                GROUP BY substr(timestamp, 1, 10), prediction, method
+                ON CONFLICT (day, prediction, method) DO UPDATE SET
+                    count = count + excluded.count,
+                    confidence_sum = confidence_sum + excluded.confidence_sum
+            ''', (cutoff, self.batch_size))
+            cursor.execute(f'DELETE FROM verifications WHERE rowid IN ({batch})', (cutoff, self.batch_size))
+            count = cursor.rowcount
+            conn.commit()
+            deleted += count
+            if count < self.batch_size:
+                break
+        conn.close()
+        return deleted
+
+    def purge_jobs(self):
+        """Delete finished async verification jobs past their retention window"""
+        cutoff = datetime.now() - timedelta(days=self.job_retention_days)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'verification_jobs'")
+        if cursor.fetchone() is None:
+            conn.close()
+            return 0
+        cursor.execute('''
+            DELETE FROM verification_jobs
+            WHERE status IN ('done', 'failed') AND completed_at < ?
+        ''', (cutoff,))
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+
+    def ensure_dictionary(self):
+        """Train a shared dictionary once enough text has been stored"""
+        if not self.codec.use_dictionary:
+            return None
+        if self.codec.current_id:
+            return self.codec.current_id
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT content FROM verifications
+            UNION ALL
+            SELECT content FROM training_data
+            LIMIT ?
+        ''', (DICTIONARY_MIN_SAMPLES * 4,))
+        samples = [self.codec.decode(row[0]) for row in cursor.fetchall()]
+        conn.close()
+
+        if len(samples) < DICTIONARY_MIN_SAMPLES:
+            return None
+        return self.codec.train_dictionary(samples)
+
+    def recompress_rows(self):
+        """Compress the next batch_size plain-text rows of each column
+
+        Walks rowids in order so values that stay plain text (too short or
+        incompressible) are not picked up again on every run.
+        """
+        columns = {
+            'verifications': ['content'],
+            'training_data': ['content', 'processed_content']
+        }
+        updated = 0
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for table, table_columns in columns.items():
+            for column in table_columns:
+                position = self.recompress_positions.get((table, column), 0)
+                cursor.execute(f'''
+                    SELECT rowid, {column} FROM {table}
+                    WHERE rowid > ? AND typeof({column}) = 'text'
+                    ORDER BY rowid
+                    LIMIT ?
+                ''', (position, self.batch_size))
+                fetched = cursor.fetchall()
+                if fetched:
+                    self.recompress_positions[(table, column)] = fetched[-1][0]
+                rows = [(self.codec.encode(value), rowid) for rowid, value in fetched]
+                # Values that stay plain text are not worth rewriting
+                rows = [row for row in rows if not isinstance(row[0], str)]
+                cursor.executemany(f'UPDATE {table} SET {column} = ? WHERE rowid = ?', rows)
+                updated += len(rows)
+        conn.commit()
+        conn.close()
+        return updated
+
+    def get_stats(self):
+        """Return database size and row counts"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        page_size = cursor.fetchone()[0]
+        cursor.execute('PRAGMA freelist_count')
+        free_pages = cursor.fetchone()[0]
+
+        counts = {}
+        for table in ('verifications', 'verification_aggregates', 'training_data', 'verification_jobs'):
+            try:
+                cursor.execute(f'SELECT COUNT(*) FROM {table}')
+                counts[table] = cursor.fetchone()[0]
+            except sqlite3.OperationalError:
+                counts[table] = 0
+        conn.close()
+
+        return {
+            'databaseSize': page_count * page_size,
+            'freeSize': free_pages * page_size,
+            'rowCounts': counts,
+            'dictionaryId': self.codec.current_id,
+            'verificationRetentionDays': self.verification_retention_days,
+            'jobRetentionDays': self.job_retention_days,
+            'lastRun': self.last_run
+        }
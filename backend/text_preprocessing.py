@@ -17,6 +17,9 @@ except LookupError:
     nltk.download('stopwords')
 
 class TextPreprocessor:
+    # Bump whenever the pipeline below changes so stored preprocessed text is refreshed
+    VERSION = 1
+
     def __init__(self):
         self.stemmer = PorterStemmer()
         self.stop_words = set(stopwords.words('english'))
@@ -95,6 +98,24 @@ class TextPreprocessor:
         
         return processed_text
     
+    def split_sentences(self, text):
+        """Split text into sentences, returning (start, end) character offsets"""
+        if not text or not isinstance(text, str):
+            return []
+        
+        spans = []
+        for match in re.finditer(r'[^.!?]+[.!?]*', text):
+            start, end = match.span()
+            # Trim surrounding whitespace from the span
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                spans.append((start, end))
+        
+        return spans
+    
     def extract_features(self, text):
         """Extract various text features for analysis"""
         if not text or not isinstance(text, str):
@@ -0,0 +1,350 @@
+import json
+import math
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+    def __init__(self, retry_after):
+        super().__init__('Verification queue is full')
+        self.retry_after = retry_after
+
+class VerificationQueue:
+    """Bounded in-process job queue drained in batches by a worker pool
+
+    Jobs and their results are persisted in the verification_jobs table so they
+    can be polled from any request and survive a restart; the in-memory queue
+    only holds job IDs waiting for a worker. Queued rows that did not fit in
+    memory (e.g. after a restart) are pulled in as workers free up room.
+    """
+
+    def __init__(self, db_path, handler, max_size=1000, workers=4, batch_size=16, batch_wait=0.05):
+        # handler(list of contents) -> list of result dicts, one per content
+        self.db_path = db_path
+        self.handler = handler
+        self.max_size = max_size
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=max_size)
+        self.lock = threading.Lock()
+        # Held for the whole of start() so no caller sees started before the table exists
+        self.start_lock = threading.Lock()
+        self.started = False
+        self.threads = []
+        # IDs currently in the in-memory queue or being processed
+        self.pending = set()
+        self.backlog = False
+
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.total_processing_time = 0.0
+        self.total_latency = 0.0
+
+    def init_table(self):
+        """Create the job table if needed"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS verification_jobs (
+                id TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_verification_jobs_status ON verification_jobs (status)')
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        """Start the worker pool and requeue jobs left over from a previous run"""
+        if self.started:
+            return
+        
+        with self.start_lock:
+            if self.started:
+                return
+            
+            self.init_table()
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE verification_jobs SET status = 'queued' WHERE status = 'running'
+            ''')
+            conn.commit()
+            conn.close()
+            
+            self.backlog = True
+            self._refill()
+            
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'verification-worker-{index}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            
+            self.started = True
+
+    def retry_after(self):
+        """Estimate seconds until there is room in the queue"""
+        with self.lock:
+            average = self.total_processing_time / self.completed if self.completed else 1.0
+        depth = self.queue.qsize()
+        return max(1, math.ceil(depth * average / self.workers))
+
+    def submit(self, content):
+        """Persist a job and enqueue it, raising QueueFullError when at capacity"""
+        self.start()
+        if self.queue.full():
+            with self.lock:
+                self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+        job_id = str(uuid.uuid4())
+        # Mark pending before the row exists so _refill never enqueues it twice
+        with self.lock:
+            self.pending.add(job_id)
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO verification_jobs (id, content, status, created_at)
+                VALUES (?, ?, 'queued', ?)
+            ''', (job_id, content, datetime.now()))
+            conn.commit()
+        except Exception:
+            if conn is not None:
+                conn.close()
+            with self.lock:
+                self.pending.discard(job_id)
+            raise
+
+        try:
+            self.queue.put_nowait(job_id)
+        except queue.Full:
+            cursor.execute('DELETE FROM verification_jobs WHERE id = ?', (job_id,))
+            conn.commit()
+            conn.close()
+            with self.lock:
+                self.pending.discard(job_id)
+                self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+        conn.close()
+        with self.lock:
+            self.submitted += 1
+        return job_id
+
+    def get(self, job_id):
+        """Return the job status and result, or None if the job is unknown"""
+        self.start()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT status, result, error, created_at, completed_at
+            FROM verification_jobs WHERE id = ?
+        ''', (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row is None:
+            return None
+
+        job = {
+            'id': job_id,
+            'status': row[0],
+            'createdAt': row[3],
+            'completedAt': row[4]
+        }
+        if row[1]:
+            job['result'] = json.loads(row[1])
+        if row[2]:
+            job['error'] = row[2]
+        return job
+
+    def get_metrics(self):
+        """Return queue depth and throughput counters"""
+        with self.lock:
+            completed = self.completed
+            return {
+                'depth': self.queue.qsize(),
+                'capacity': self.max_size,
+                'workers': self.workers,
+                'batchSize': self.batch_size,
+                'inFlight': self.in_flight,
+                'submitted': self.submitted,
+                'completed': completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'averageBatchSize': completed / self.batches if self.batches else 0.0,
+                'averageProcessingTime': self.total_processing_time / completed if completed else 0.0,
+                'averageLatency': self.total_latency / completed if completed else 0.0
+            }
+
+    def _refill(self):
+        """Move queued jobs from the table into free queue slots"""
+        if not self.backlog:
+            return
+        
+        with self.lock:
+            free = self.max_size - self.queue.qsize()
+            skip = set(self.pending)
+        if free <= 0:
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM verification_jobs
+            WHERE status = 'queued'
+            ORDER BY created_at
+            LIMIT ?
+        ''', (free + len(skip),))
+        rows = cursor.fetchall()
+        conn.close()
+        job_ids = [job_id for (job_id,) in rows if job_id not in skip]
+        
+        for job_id in job_ids[:free]:
+            with self.lock:
+                if job_id in self.pending:
+                    continue
+                self.pending.add(job_id)
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                with self.lock:
+                    self.pending.discard(job_id)
+                return
+        
+        # A short read means every queued row is now in memory
+        if len(rows) < free + len(skip):
+            self.backlog = False
+    
+    def _mark_failed(self, job_ids, error):
+        """Fail jobs left running after an unexpected worker error"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE verification_jobs SET status = 'failed', error = ?, completed_at = ?
+                WHERE id = ? AND status = 'running'
+            ''', [(error, datetime.now(), job_id) for job_id in job_ids])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Failed to mark verification jobs failed: {e}")
+    
+    def _next_batch(self):
+        """Block for one job, then collect more for up to batch_wait seconds"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        """Drain the queue in batches until the process exits"""
+        while True:
+            job_ids = self._next_batch()
+            with self.lock:
+                self.in_flight += len(job_ids)
+            try:
+                self._process(job_ids)
+            except Exception as e:
+                print(f"Verification worker error: {e}")
+                self._mark_failed(job_ids, 'Verification failed')
+                with self.lock:
+                    self.failed += len(job_ids)
+            finally:
+                with self.lock:
+                    self.in_flight -= len(job_ids)
+                    self.pending.difference_update(job_ids)
+                for _ in job_ids:
+                    self.queue.task_done()
+            
+            try:
+                self._refill()
+            except Exception as e:
+                print(f"Verification refill error: {e}")
+
+    def _process(self, job_ids):
+        """Run the handler over one batch and store each job's outcome"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        # Claim each job atomically so a job is never processed twice
+        claimed = []
+        for job_id in job_ids:
+            cursor.execute('''
+                UPDATE verification_jobs SET status = 'running' WHERE id = ? AND status = 'queued'
+            ''', (job_id,))
+            if cursor.rowcount == 1:
+                claimed.append(job_id)
+        conn.commit()
+        if not claimed:
+            conn.close()
+            return
+
+        placeholders = ','.join('?' * len(claimed))
+        cursor.execute(f'''
+            SELECT id, content, created_at FROM verification_jobs
+            WHERE id IN ({placeholders})
+        ''', claimed)
+        jobs = cursor.fetchall()
+
+        start = time.perf_counter()
+        try:
+            results = self.handler([job[1] for job in jobs])
+            error = None
+        except Exception as e:
+            print(f"Verification batch error: {e}")
+            results = [None] * len(jobs)
+            error = 'Verification failed'
+        elapsed = time.perf_counter() - start
+
+        now = datetime.now()
+        cursor.executemany('''
+            UPDATE verification_jobs SET status = ?, result = ?, error = ?, completed_at = ?
+            WHERE id = ?
+        ''', [
+            ('done', json.dumps(result), None, now, job[0]) if result is not None
+            else ('failed', None, error, now, job[0])
+            for job, result in zip(jobs, results)
+        ])
+        conn.commit()
+        conn.close()
+
+        latency = 0.0
+        for job in jobs:
+            try:
+                latency += (now - datetime.fromisoformat(str(job[2]))).total_seconds()
+            except ValueError:
+                pass
+
+        with self.lock:
+            self.batches += 1
+            if error:
+                self.failed += len(jobs)
+            else:
+                self.completed += len(jobs)
+                self.total_processing_time += elapsed
+                self.total_latency += latency